@@ -8,10 +8,13 @@ from playwright.async_api import (
     Browser,
     BrowserContext,
 )
+import asyncio
 import json
 import logging
 import os
+import time
 from datetime import datetime
+from toyoko_mcp.geo import HotelGeoIndex, parse_hotel_location
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
@@ -26,9 +29,31 @@ This server provides tools to interact with the Toyoko-Inn website.
 )
 
 # Keep Playwright as a global variable for efficient browser operations
-URLs = {"top": "https://www.toyoko-inn.com/corporation?lcl_id=ja"}
+URLs = {
+    "top": "https://www.toyoko-inn.com/corporation?lcl_id=ja",
+    "hotel_detail": "https://www.toyoko-inn.com/Search/Detail/{hotel_id}/?lcl_id=ja",
+}
 playwright: Optional[Playwright] = None
 
+# Maximum number of pages opened at the same time for detail scraping and searches
+MAX_PARALLEL_PAGES = 3
+# Maximum number of nearby hotels checked by find_nearest_available in one call
+MAX_NEAREST_CANDIDATES = 6
+# Timeout for loading a hotel detail page in milliseconds
+DETAIL_PAGE_TIMEOUT_MS = 10000
+# Seconds before retrying a hotel whose location could not be scraped
+LOCATION_RETRY_SECONDS = 3600
+
+# Arguments required to search the vacancy of a hotel
+SEARCH_ARGUMENTS = ["region_id", "hotel_id", "nights", "month", "day"]
+
+# Hotels keyed by hotel ID, with location details scraped once from the detail pages
+hotel_catalog: Dict[str, Dict[str, Any]] = {}
+# Time when the location of a hotel could not be scraped, keyed by hotel ID
+location_missing_at: Dict[str, float] = {}
+# Spatial indexes over the catalog keyed by region IDs, cleared when the catalog grows
+hotel_indexes: Dict[tuple[str, ...], HotelGeoIndex] = {}
+
 
 class Context:
     """
@@ -38,14 +63,23 @@ class Context:
     browser: Optional[Browser] = None
     context: Optional[BrowserContext] = None
     main_page: Optional[Page] = None
-
-    def __init__(self, browser: Browser, context: BrowserContext, main_page: Page):
+    search_url: Optional[str] = None
+
+    def __init__(
+        self,
+        browser: Browser,
+        context: BrowserContext,
+        main_page: Page,
+        search_url: str,
+    ):
         """
-        Initialize the context with browser, context, and main page.
+        Initialize the context with browser, context, main page and the URL of
+        the search form.
         """
         self.browser = browser
         self.context = context
         self.main_page = main_page
+        self.search_url = search_url
 
     async def close(self) -> None:
         """
@@ -147,6 +181,34 @@ async def list_tools() -> list[types.Tool]:
                 "required": ["region_id", "hotel_id", "month", "day", "nights"],
             },
         ),
+        types.Tool(
+            name="find_nearest_available",
+            description="Find the nearest hotel with rooms available when the given hotel in Toyoko Inn(東横イン) is full. Only hotels in the region of the hotel and in 'nearby_region_ids' are searched.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "region_id": {"type": "string", "description": "ID of the region"},
+                    "hotel_id": {"type": "string", "description": "ID of the hotel"},
+                    "month": {"type": "string", "description": "Month of the booking"},
+                    "day": {"type": "string", "description": "Day of the booking"},
+                    "nights": {"type": "integer", "description": "Number of nights"},
+                    "max_candidates": {
+                        "type": "integer",
+                        "description": "Maximum number of nearby hotels to check (default: 3, at most 6)",
+                    },
+                    "max_distance_km": {
+                        "type": "number",
+                        "description": "Maximum distance from the hotel in kilometers",
+                    },
+                    "nearby_region_ids": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "IDs of other regions to search, such as regions across the border",
+                    },
+                },
+                "required": ["region_id", "hotel_id", "month", "day", "nights"],
+            },
+        ),
     ]
 
 
@@ -167,6 +229,8 @@ async def call_tool(
         return await is_available_room(name, arguments)
     elif name == "reserve_room":
         return await reserve_room(name, arguments)
+    elif name == "find_nearest_available":
+        return await find_nearest_available(name, arguments)
     else:
         raise ValueError(f"Tool '{name}' not found.")
 
@@ -237,7 +301,8 @@ async def login(
         await main_page.get_by_role("button", name="ログイン").click()
 
     global context
-    context = Context(browser, browser_context, main_page)
+    # The page right after login has the search form, so keep its URL for other pages
+    context = Context(browser, browser_context, main_page, main_page.url)
 
     return [types.TextContent(type="text", text="Login successfully")]
 
@@ -260,6 +325,125 @@ async def get_select_options(page: Page, select_selector: str) -> list[dict[str,
     return options_list
 
 
+async def fetch_hotel_location(
+    browser_context: BrowserContext, hotel_id: str
+) -> dict[str, Any]:
+    """
+    Scrape the coordinates and the nearest station from the hotel detail page.
+    """
+    page = await browser_context.new_page()
+    try:
+        await page.goto(
+            URLs["hotel_detail"].format(hotel_id=hotel_id),
+            timeout=DETAIL_PAGE_TIMEOUT_MS,
+        )
+        html = await page.content()
+        text = await page.inner_text("body")
+    finally:
+        await page.close()
+    location = parse_hotel_location(html, text)
+    logger.debug(f"Location of hotel {hotel_id}: {location}")
+    return location
+
+
+async def load_hotel_locations(
+    browser_context: BrowserContext, hotels: list[dict[str, Any]]
+) -> None:
+    """
+    Add the hotels to the catalog, scraping the detail pages of new hotels only.
+
+    Hotels whose location could not be scraped are kept without coordinates and
+    retried after LOCATION_RETRY_SECONDS.
+    """
+    semaphore = asyncio.Semaphore(MAX_PARALLEL_PAGES)
+
+    async def load(hotel: dict[str, Any]) -> None:
+        location: dict[str, Any] = {
+            "latitude": None,
+            "longitude": None,
+            "station": None,
+            "walk_minutes": None,
+        }
+        async with semaphore:
+            try:
+                location = await fetch_hotel_location(browser_context, hotel["id"])
+            except Exception as e:
+                logger.warning(f"Failed to fetch location of hotel {hotel['id']}: {e}")
+        if location["latitude"] is None or location["longitude"] is None:
+            logger.warning(f"Location of hotel {hotel['id']} is not found.")
+            location_missing_at[hotel["id"]] = time.monotonic()
+        else:
+            location_missing_at.pop(hotel["id"], None)
+        hotel_catalog[hotel["id"]] = {**hotel, **location}
+
+    def is_loaded(hotel_id: str) -> bool:
+        if hotel_id not in hotel_catalog:
+            return False
+        missing_at = location_missing_at.get(hotel_id)
+        return (
+            missing_at is None or time.monotonic() - missing_at < LOCATION_RETRY_SECONDS
+        )
+
+    new_hotels = [hotel for hotel in hotels if not is_loaded(hotel["id"])]
+    if new_hotels:
+        await asyncio.gather(*(load(hotel) for hotel in new_hotels))
+        hotel_indexes.clear()
+
+
+def get_hotel_index(region_ids: list[str]) -> HotelGeoIndex:
+    """
+    Return the spatial index over the hotels of the regions, building it if needed.
+    """
+    key = tuple(sorted(region_ids))
+    if key not in hotel_indexes:
+        hotel_indexes[key] = HotelGeoIndex(
+            [hotel for hotel in hotel_catalog.values() if hotel["region_id"] in key]
+        )
+    return hotel_indexes[key]
+
+
+def clear_hotel_catalog() -> None:
+    """
+    Forget all scraped hotel locations.
+    """
+    hotel_catalog.clear()
+    location_missing_at.clear()
+    hotel_indexes.clear()
+
+
+async def load_region_hotels(
+    page: Page, browser_context: Optional[BrowserContext], region_id: str
+) -> list[dict[str, Any]]:
+    """
+    List the hotels of the region on the page, with their locations if known.
+
+    The detail pages are scraped only when the browser context is given.
+    """
+    await page.get_by_label("行先").select_option(region_id)
+    await page.wait_for_timeout(
+        1000
+    )  # Wait for the hotel list to be updated by JavaScript
+    options = await get_select_options(page, "#sel_htl")
+    hotels = [
+        {"id": option["value"], "hotel": option["text"], "region_id": region_id}
+        for option in options
+        if option["value"] != ""
+    ]
+    if browser_context is not None:
+        await load_hotel_locations(browser_context, hotels)
+    return [hotel_catalog.get(hotel["id"], hotel) for hotel in hotels]
+
+
+def check_search_arguments(arguments: dict[str, Any]) -> Optional[str]:
+    """
+    Return an error message if an argument required to search is missing.
+    """
+    for key in SEARCH_ARGUMENTS:
+        if arguments.get(key) is None:
+            return f"Argument '{key}' is required."
+    return None
+
+
 async def list_region(
     name: str, arguments: dict[str, int]
 ) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
@@ -320,26 +504,8 @@ async def list_hotel(
         await context.close()
         return [types.TextContent(type="text", text="Page not found.")]
 
-    # Ensure the element with label "行先" exists
-    region = page.get_by_label("行先")
-    if region is None:
-        return [
-            types.TextContent(
-                type="text",
-                text="Failed to find element with label '行先'. Invalid Page.",
-            )
-        ]
-
-    await region.select_option(region_id)
-    await page.wait_for_timeout(
-        1000
-    )  # Wait for the hotel list to be updated by JavaScript
-    options = await get_select_options(page, "#sel_htl")
-    result_dict = [
-        {"id": option["value"], "hotel": option["text"]}
-        for option in options
-        if option["value"] != ""
-    ]
+    # Locations are scraped by find_nearest_available, so only the known ones are added
+    result_dict = await load_region_hotels(page, None, region_id)
 
     return [
         types.TextContent(type="text", text=json.dumps(result_dict, ensure_ascii=False))
@@ -369,42 +535,30 @@ async def is_available_room(
         await context.close()
         return [types.TextContent(type="text", text="Page not found.")]
 
-    region_id = arguments.get("region_id")
-    if region_id is None:
-        return [
-            types.TextContent(type="text", text="Argument 'region_id' is required.")
-        ]
+    error = check_search_arguments(arguments)
+    if error is not None:
+        return [types.TextContent(type="text", text=error)]
 
-    region = page.get_by_label("行先")
-    if region is None:
-        return [
-            types.TextContent(type="text", text="Element with label '行先' not found.")
-        ]
-    await region.select_option(region_id)
+    if await search_vacancy(page, arguments):
+        return [types.TextContent(type="text", text="Rooms available")]
+    else:
+        return [types.TextContent(type="text", text="No rooms available")]
 
-    hotel_id = arguments.get("hotel_id")
-    if hotel_id is None:
-        return [types.TextContent(type="text", text="Argument 'hotel_id' is required.")]
-    hotel = page.locator("#sel_htl")
-    if hotel is None:
-        return [
-            types.TextContent(type="text", text="Element with Id '#sel_htl' not found.")
-        ]
-    await hotel.select_option(hotel_id)
-    nights = arguments.get("nights")
-    if nights is None:
-        return [types.TextContent(type="text", text="Argument 'nights' is required.")]
-    await page.get_by_label("泊数").select_option(str(nights))
-
-    month = arguments.get("month")
-    if month is None:
-        return [types.TextContent(type="text", text="Argument 'month' is required.")]
-    month = str(month).zfill(2)
-
-    day = arguments.get("day")
-    if day is None:
-        return [types.TextContent(type="text", text="Argument 'day' is required.")]
-    day = str(day).zfill(2)
+
+async def search_vacancy(page: Page, arguments: dict[str, Any]) -> bool:
+    """
+    Search the vacancy of the hotel on the given page and return whether rooms
+    are available.
+
+    The arguments must be checked with check_search_arguments() beforehand.
+    """
+
+    await page.get_by_label("行先").select_option(arguments["region_id"])
+    await page.locator("#sel_htl").select_option(arguments["hotel_id"])
+    await page.get_by_label("泊数").select_option(str(arguments["nights"]))
+
+    month = str(arguments["month"]).zfill(2)
+    day = str(arguments["day"]).zfill(2)
 
     year = datetime.now().year
 
@@ -435,10 +589,7 @@ async def is_available_room(
     await page.wait_for_timeout(1000)  # Wait for the status to be updated by JavaScript
     logger.debug(f"no vacancy: {no_vacancy}")
 
-    if no_vacancy is None:
-        return [types.TextContent(type="text", text="Rooms available")]
-    else:
-        return [types.TextContent(type="text", text="No rooms available")]
+    return no_vacancy is None
 
 
 async def reserve_room(
@@ -521,6 +672,164 @@ async def reserve_room(
     return [types.TextContent(type="text", text="Failed to reserve a room")]
 
 
+async def find_nearest_available(
+    name: str, arguments: dict[str, Any]
+) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+    """
+    Find the nearest hotel with rooms available in Toyoko Inn(東横イン).
+    """
+
+    error = check_search_arguments(arguments)
+    if error is not None:
+        return [types.TextContent(type="text", text=error)]
+
+    try:
+        max_candidates = int(arguments.get("max_candidates", MAX_PARALLEL_PAGES))
+    except (TypeError, ValueError):
+        max_candidates = 0
+    if max_candidates < 1:
+        return [
+            types.TextContent(
+                type="text",
+                text="Argument 'max_candidates' must be a positive integer.",
+            )
+        ]
+    max_candidates = min(max_candidates, MAX_NEAREST_CANDIDATES)
+
+    max_distance_km: Optional[float] = None
+    if arguments.get("max_distance_km") is not None:
+        try:
+            max_distance_km = float(arguments["max_distance_km"])
+        except (TypeError, ValueError):
+            return [
+                types.TextContent(
+                    type="text", text="Argument 'max_distance_km' must be a number."
+                )
+            ]
+
+    nearby_region_ids = arguments.get("nearby_region_ids") or []
+    if not isinstance(nearby_region_ids, list) or not all(
+        isinstance(nearby_region_id, str) for nearby_region_id in nearby_region_ids
+    ):
+        return [
+            types.TextContent(
+                type="text",
+                text="Argument 'nearby_region_ids' must be a list of region IDs.",
+            )
+        ]
+
+    global context
+    if context is None:
+        await login("login", {})
+
+    if (
+        context is None
+        or context.context is None
+        or context.main_page is None
+        or context.search_url is None
+    ):
+        return [
+            types.TextContent(
+                type="text", text="Failed to log in or main page is not available."
+            )
+        ]
+    browser_context = context.context
+    search_url = context.search_url
+
+    region_id = str(arguments["region_id"])
+    hotel_id = arguments["hotel_id"]
+    region_ids = list(dict.fromkeys([region_id, *nearby_region_ids]))
+    searched_regions = ", ".join(region_ids)
+
+    # Load the hotels of the regions into the catalog, scraping new ones only
+    for index, searched_region_id in enumerate(region_ids):
+        hotels = await load_region_hotels(
+            context.main_page, browser_context, searched_region_id
+        )
+        if index == 0 and all(hotel["id"] != hotel_id for hotel in hotels):
+            return [
+                types.TextContent(
+                    type="text",
+                    text=f"Hotel '{hotel_id}' not found in region '{region_id}'.",
+                )
+            ]
+
+    origin = hotel_catalog[hotel_id]
+    if origin["latitude"] is None or origin["longitude"] is None:
+        return [
+            types.TextContent(
+                type="text",
+                text=f"Location of hotel '{hotel_id}' could not be loaded.",
+            )
+        ]
+
+    candidates = [
+        (distance, hotel)
+        for distance, hotel in get_hotel_index(region_ids).nearest(
+            origin["latitude"], origin["longitude"], max_candidates + 1, max_distance_km
+        )
+        if hotel["id"] != hotel_id
+    ][:max_candidates]
+    if not candidates:
+        return [
+            types.TextContent(
+                type="text",
+                text=f"No hotels to check near hotel '{hotel_id}' in regions {searched_regions}.",
+            )
+        ]
+
+    async def check(hotel: dict[str, Any]) -> bool:
+        page = await browser_context.new_page()
+        try:
+            await page.goto(search_url)
+            return await search_vacancy(
+                page,
+                {**arguments, "region_id": hotel["region_id"], "hotel_id": hotel["id"]},
+            )
+        finally:
+            await page.close()
+
+    # Check the candidates in distance order and stop at the first batch with a vacancy
+    failed = 0
+    for start in range(0, len(candidates), MAX_PARALLEL_PAGES):
+        batch = candidates[start : start + MAX_PARALLEL_PAGES]
+        results = await asyncio.gather(
+            *(check(hotel) for _, hotel in batch), return_exceptions=True
+        )
+        for (distance, hotel), available in zip(batch, results):
+            if isinstance(available, BaseException):
+                # Keep checking the other candidates, but do not report them as full
+                logger.warning(f"Failed to search hotel {hotel['id']}: {available}")
+                failed += 1
+                continue
+            logger.debug(f"Vacancy of hotel {hotel['id']}: {available}")
+            if available:
+                result_dict = {
+                    **hotel,
+                    "distance_km": round(distance, 2),
+                    "searched_regions": region_ids,
+                }
+                return [
+                    types.TextContent(
+                        type="text", text=json.dumps(result_dict, ensure_ascii=False)
+                    )
+                ]
+
+    if failed > 0:
+        return [
+            types.TextContent(
+                type="text",
+                text=f"Failed to check {failed} of {len(candidates)} candidates in regions {searched_regions}.",
+            )
+        ]
+    return [
+        types.TextContent(
+            type="text",
+            text=f"No rooms available in the {len(candidates)} nearest hotels in regions {searched_regions}.",
+        )
+    ]
+
+
 async def save_dom(page: Page, path: str) -> None:
     """
     Save the DOM of the page to a file.
@@ -0,0 +1,219 @@
+from typing import Any, Dict, List, Optional, Tuple
+import heapq
+import math
+import re
+
+EARTH_RADIUS_KM = 6371.0
+
+# Patterns to find coordinates in the hotel detail page (map links, embeds and scripts)
+COORDINATE_PATTERNS = [
+    re.compile(
+        r"[?&](?:q|ll|center|query|destination)=(-?\d{1,2}\.\d+)(?:,|%2C)\s*(-?\d{1,3}\.\d+)"
+    ),
+    re.compile(r"@(-?\d{1,2}\.\d+),(-?\d{1,3}\.\d+)"),
+    re.compile(
+        r"\blat(?:itude)?[\"']?\s*[:=]\s*[\"']?(-?\d{1,2}\.\d+)[\s\S]{0,200}?"
+        r"\b(?:lng|lon|longitude)[\"']?\s*[:=]\s*[\"']?(-?\d{1,3}\.\d+)",
+        re.IGNORECASE,
+    ),
+]
+
+# Pattern to find the nearest station in access text such as "JR品川駅高輪口より徒歩3分"
+# or "最寄り駅：品川駅 徒歩3分". The station is the last "駅" before "徒歩", and a
+# leading "最寄り駅" label is skipped.
+STATION_PATTERN = re.compile(
+    r"(?:最寄り?駅\s*[:：]?\s*)?"
+    r"([^\s、。,・:：()（）「」]+駅)[^\s、。,・:：駅]*?"
+    r"\s*(?:から|より)?\s*徒歩\s*(?:約)?\s*(\d+)\s*分"
+)
+
+
+def parse_hotel_location(html: str, text: str) -> Dict[str, Any]:
+    """
+    Extract coordinates from the HTML and the nearest station from the visible
+    text of a hotel detail page.
+    """
+    location: Dict[str, Any] = {
+        "latitude": None,
+        "longitude": None,
+        "station": None,
+        "walk_minutes": None,
+    }
+
+    for pattern in COORDINATE_PATTERNS:
+        match = pattern.search(html)
+        if match is None:
+            continue
+        latitude, longitude = float(match.group(1)), float(match.group(2))
+        if -90 <= latitude <= 90 and -180 <= longitude <= 180:
+            location["latitude"] = latitude
+            location["longitude"] = longitude
+            break
+
+    station = STATION_PATTERN.search(text)
+    if station is not None:
+        location["station"] = station.group(1)
+        location["walk_minutes"] = int(station.group(2))
+
+    return location
+
+
+def haversine_distance_km(
+    latitude1: float, longitude1: float, latitude2: float, longitude2: float
+) -> float:
+    """
+    Return the great-circle distance between two points in kilometers.
+    """
+    phi1 = math.radians(latitude1)
+    phi2 = math.radians(latitude2)
+    delta_phi = math.radians(latitude2 - latitude1)
+    delta_lambda = math.radians(longitude2 - longitude1)
+    a = (
+        math.sin(delta_phi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def to_cartesian(latitude: float, longitude: float) -> Tuple[float, float, float]:
+    """
+    Convert a coordinate to a point on a sphere of the Earth's radius in kilometers.
+
+    The straight-line (chord) distance between such points grows monotonically
+    with the great-circle distance, so the KD-tree orders hotels exactly.
+    """
+    phi = math.radians(latitude)
+    lambda_ = math.radians(longitude)
+    return (
+        EARTH_RADIUS_KM * math.cos(phi) * math.cos(lambda_),
+        EARTH_RADIUS_KM * math.cos(phi) * math.sin(lambda_),
+        EARTH_RADIUS_KM * math.sin(phi),
+    )
+
+
+def chord_length_km(distance_km: float) -> float:
+    """
+    Convert a great-circle distance to the matching chord length.
+    """
+    return (
+        2
+        * EARTH_RADIUS_KM
+        * math.sin(min(distance_km / (2 * EARTH_RADIUS_KM), math.pi / 2))
+    )
+
+
+class KDNode:
+    """
+    Node of the 3-dimensional KD-tree.
+    """
+
+    def __init__(
+        self,
+        point: Tuple[float, float, float],
+        hotel: Dict[str, Any],
+        axis: int,
+        left: Optional["KDNode"],
+        right: Optional["KDNode"],
+    ):
+        """
+        Initialize the node with its Cartesian point, hotel and children.
+        """
+        self.point = point
+        self.hotel = hotel
+        self.axis = axis
+        self.left = left
+        self.right = right
+
+
+class HotelGeoIndex:
+    """
+    Spatial index over hotels that have 'latitude' and 'longitude' keys.
+    """
+
+    def __init__(self, hotels: List[Dict[str, Any]]):
+        """
+        Build a KD-tree from the hotels, skipping those without coordinates.
+        """
+        entries = [
+            (to_cartesian(hotel["latitude"], hotel["longitude"]), hotel)
+            for hotel in hotels
+            if hotel.get("latitude") is not None and hotel.get("longitude") is not None
+        ]
+        self.size = len(entries)
+        self.root = self._build(entries, 0)
+
+    def _build(
+        self,
+        entries: List[Tuple[Tuple[float, float, float], Dict[str, Any]]],
+        depth: int,
+    ) -> Optional[KDNode]:
+        """
+        Recursively build the KD-tree by splitting on the median.
+        """
+        if not entries:
+            return None
+        axis = depth % 3
+        entries = sorted(entries, key=lambda entry: entry[0][axis])
+        median = len(entries) // 2
+        point, hotel = entries[median]
+        return KDNode(
+            point,
+            hotel,
+            axis,
+            self._build(entries[:median], depth + 1),
+            self._build(entries[median + 1 :], depth + 1),
+        )
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        count: int,
+        max_distance_km: Optional[float] = None,
+    ) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        Return up to 'count' (distance_km, hotel) pairs ordered by distance.
+        """
+        if count <= 0 or self.root is None:
+            return []
+
+        target = to_cartesian(latitude, longitude)
+        max_chord = (
+            None if max_distance_km is None else chord_length_km(max_distance_km)
+        )
+        # Max-heap of the best candidates found so far, keyed by negated distance
+        best: List[Tuple[float, int, Dict[str, Any]]] = []
+
+        def visit(node: Optional[KDNode]) -> None:
+            if node is None:
+                return
+            distance = math.dist(target, node.point)
+            if max_chord is None or distance <= max_chord:
+                entry = (-distance, id(node), node.hotel)
+                if len(best) < count:
+                    heapq.heappush(best, entry)
+                elif distance < -best[0][0]:
+                    heapq.heapreplace(best, entry)
+
+            offset = target[node.axis] - node.point[node.axis]
+            near, far = (
+                (node.left, node.right) if offset < 0 else (node.right, node.left)
+            )
+            visit(near)
+            radius = -best[0][0] if len(best) == count else max_chord
+            if radius is None or abs(offset) <= radius:
+                visit(far)
+
+        visit(self.root)
+
+        result = [
+            (
+                haversine_distance_km(
+                    latitude, longitude, hotel["latitude"], hotel["longitude"]
+                ),
+                hotel,
+            )
+            for _, _, hotel in best
+        ]
+        result.sort(key=lambda entry: entry[0])
+        return result
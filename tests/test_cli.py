@@ -1,4 +1,4 @@
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator
 import os
 import re
 from pathlib import Path
@@ -6,8 +6,10 @@ from urllib.parse import quote
 
 import pytest
 from pytest_asyncio import fixture  # Import fixture from pytest-asyncio
+from toyoko_mcp import core
 from toyoko_mcp.core import (
     call_tool,
+    clear_hotel_catalog,
     list_tools,
     initialize_playwright,
     shutdown_playwright,
@@ -24,9 +26,9 @@ def replace_url_to_mock() -> None:
     Replaces the URL in the `URLs` dictionary with a mock file URL and sets
     environment variables for testing purposes.
     This function performs the following actions:
-    1. Updates the "top" key in the `URLs` dictionary to point to a local
-       mock HTML file located in the `pages` directory relative to the
-       current script's directory.
+    1. Updates the "top" and "hotel_detail" keys in the `URLs` dictionary to
+       point to local mock HTML files located in the `pages` directory
+       relative to the current script's directory.
     2. Sets the `CORPORATE_ID` environment variable to a mock corporate ID.
     3. Sets the `USER_EMAIL` environment variable to a mock email address.
     4. Sets the `USER_PASSWORD` environment variable to a mock password.
@@ -39,6 +41,10 @@ def replace_url_to_mock() -> None:
 
     current_dir = Path(__file__).parent
     URLs["top"] = quote(f"file://{current_dir}/pages/top.html", safe=":/")
+    URLs["hotel_detail"] = (
+        quote(f"file://{current_dir}/pages/detail.html", safe=":/")
+        + "?hotel_id={hotel_id}"
+    )
     os.environ["CORPORATE_ID"] = "B123-456789"
     os.environ["USER_EMAIL"] = "someone@example.com"
     os.environ["USER_PASSWORD"] = "1234"
@@ -51,6 +57,7 @@ async def setup_playwright() -> AsyncGenerator[None, None]:
     Ensure Playwright is initialized and shut down properly.
     """
     replace_url_to_mock()
+    clear_hotel_catalog()
 
     await initialize_playwright()
     yield
@@ -63,7 +70,7 @@ async def test_list_tools() -> None:
     Test the list_tools function.
     """
     result = await list_tools()
-    assert len(result) == 5
+    assert len(result) == 6
 
 
 @pytest.mark.asyncio  # type: ignore
@@ -97,6 +104,7 @@ async def test_list_hotel() -> None:
     assert len(result) == 1
     assert result[0].type == "text"
     assert re.search("天王洲アイル", result[0].text)
+    assert not re.search('"latitude"', result[0].text)
 
 
 @pytest.mark.asyncio  # type: ignore
@@ -117,3 +125,206 @@ async def test_is_available_room() -> None:
     assert len(result) == 1
     assert result[0].type == "text"
     assert re.search("Rooms available", result[0].text)
+
+
+@pytest.mark.asyncio  # type: ignore
+async def test_find_nearest_available() -> None:
+    """
+    Test that find_nearest_available returns the nearest other hotel.
+    """
+    result = await call_tool(
+        "find_nearest_available",
+        {
+            "region_id": "79",
+            "hotel_id": "00244",
+            "month": 3,
+            "day": 1,
+            "nights": 1,
+        },
+    )
+    assert len(result) == 1
+    assert result[0].type == "text"
+    assert re.search('"id": "00029"', result[0].text)
+    assert re.search('"distance_km": 0.98', result[0].text)
+    assert re.search('"searched_regions": \\["79"\\]', result[0].text)
+
+    # The scraped locations are added to the hotel list
+    result = await call_tool("list_hotel", {"region_id": "79"})
+    assert re.search('"latitude": 35.6283', result[0].text)
+    assert re.search('"station": "JR品川駅"', result[0].text)
+
+
+@pytest.mark.asyncio  # type: ignore
+async def test_find_nearest_available_out_of_distance() -> None:
+    """
+    Test find_nearest_available when no hotel is within the maximum distance.
+    """
+    result = await call_tool(
+        "find_nearest_available",
+        {
+            "region_id": "79",
+            "hotel_id": "00244",
+            "month": 3,
+            "day": 1,
+            "nights": 1,
+            "max_distance_km": 0.5,
+        },
+    )
+    assert len(result) == 1
+    assert result[0].type == "text"
+    assert result[0].text == "No hotels to check near hotel '00244' in regions 79."
+
+
+@pytest.mark.asyncio  # type: ignore
+async def test_find_nearest_available_skips_full_hotels(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """
+    Test that full hotels and failed searches are skipped in distance order.
+    """
+
+    async def search_vacancy(page: Any, arguments: dict[str, Any]) -> bool:
+        if arguments["hotel_id"] == "00049":
+            raise RuntimeError("Search failed")
+        return bool(arguments["hotel_id"] != "00029")
+
+    monkeypatch.setattr(core, "search_vacancy", search_vacancy)
+    # Check one candidate per batch to cover the early exit across batches
+    monkeypatch.setattr(core, "MAX_PARALLEL_PAGES", 1)
+    result = await call_tool(
+        "find_nearest_available",
+        {
+            "region_id": "79",
+            "hotel_id": "00244",
+            "month": 3,
+            "day": 1,
+            "nights": 1,
+        },
+    )
+    assert len(result) == 1
+    assert result[0].type == "text"
+    assert re.search('"id": "00146"', result[0].text)
+
+
+@pytest.mark.asyncio  # type: ignore
+async def test_find_nearest_available_no_vacancy(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """
+    Test find_nearest_available when all the nearest hotels are full.
+    """
+
+    async def search_vacancy(page: Any, arguments: dict[str, Any]) -> bool:
+        return False
+
+    monkeypatch.setattr(core, "search_vacancy", search_vacancy)
+    result = await call_tool(
+        "find_nearest_available",
+        {
+            "region_id": "79",
+            "hotel_id": "00244",
+            "month": 3,
+            "day": 1,
+            "nights": 1,
+            "max_candidates": 2,
+        },
+    )
+    assert len(result) == 1
+    assert result[0].type == "text"
+    assert result[0].text == "No rooms available in the 2 nearest hotels in regions 79."
+
+
+@pytest.mark.asyncio  # type: ignore
+async def test_find_nearest_available_search_failed(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """
+    Test that failed searches are not reported as no vacancy.
+    """
+
+    async def search_vacancy(page: Any, arguments: dict[str, Any]) -> bool:
+        if arguments["hotel_id"] == "00029":
+            raise RuntimeError("Search failed")
+        return False
+
+    monkeypatch.setattr(core, "search_vacancy", search_vacancy)
+    result = await call_tool(
+        "find_nearest_available",
+        {
+            "region_id": "79",
+            "hotel_id": "00244",
+            "month": 3,
+            "day": 1,
+            "nights": 1,
+        },
+    )
+    assert len(result) == 1
+    assert result[0].type == "text"
+    assert result[0].text == "Failed to check 1 of 3 candidates in regions 79."
+
+
+@pytest.mark.asyncio  # type: ignore
+async def test_find_nearest_available_without_location() -> None:
+    """
+    Test find_nearest_available with a hotel whose location is not available.
+    """
+    result = await call_tool(
+        "find_nearest_available",
+        {
+            "region_id": "79",
+            "hotel_id": "00246",
+            "month": 3,
+            "day": 1,
+            "nights": 1,
+        },
+    )
+    assert len(result) == 1
+    assert result[0].type == "text"
+    assert result[0].text == "Location of hotel '00246' could not be loaded."
+
+
+@pytest.mark.asyncio  # type: ignore
+async def test_find_nearest_available_unknown_hotel() -> None:
+    """
+    Test find_nearest_available with a hotel not in the region.
+    """
+    result = await call_tool(
+        "find_nearest_available",
+        {
+            "region_id": "79",
+            "hotel_id": "99999",
+            "month": 3,
+            "day": 1,
+            "nights": 1,
+        },
+    )
+    assert len(result) == 1
+    assert result[0].type == "text"
+    assert result[0].text == "Hotel '99999' not found in region '79'."
+
+
+@pytest.mark.asyncio  # type: ignore
+async def test_find_nearest_available_invalid_arguments() -> None:
+    """
+    Test that find_nearest_available checks the arguments before searching.
+    """
+    result = await call_tool(
+        "find_nearest_available",
+        {"region_id": "79", "hotel_id": "00244", "day": 1, "nights": 1},
+    )
+    assert result[0].type == "text"
+    assert result[0].text == "Argument 'month' is required."
+
+    result = await call_tool(
+        "find_nearest_available",
+        {
+            "region_id": "79",
+            "hotel_id": "00244",
+            "month": 3,
+            "day": 1,
+            "nights": 1,
+            "max_candidates": "many",
+        },
+    )
+    assert result[0].type == "text"
+    assert result[0].text == "Argument 'max_candidates' must be a positive integer."
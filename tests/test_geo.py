@@ -0,0 +1,67 @@
+from typing import Any
+
+from toyoko_mcp.geo import HotelGeoIndex, haversine_distance_km, parse_hotel_location
+
+
+def test_parse_hotel_location() -> None:
+    """
+    Test the parse_hotel_location function.
+    """
+    html = '<iframe src="https://maps.google.com/maps?q=35.6283,139.7387&z=16">'
+    text = "アクセス\nJR品川駅高輪口より徒歩3分"
+    location = parse_hotel_location(html, text)
+    assert location["latitude"] == 35.6283
+    assert location["longitude"] == 139.7387
+    assert location["station"] == "JR品川駅"
+    assert location["walk_minutes"] == 3
+
+
+def test_parse_hotel_location_with_station_label() -> None:
+    """
+    Test that the "最寄り駅" label is not taken as the station name.
+    """
+    location = parse_hotel_location("", "最寄り駅：品川駅 徒歩3分")
+    assert location["station"] == "品川駅"
+    assert location["walk_minutes"] == 3
+
+
+def test_parse_hotel_location_without_location() -> None:
+    """
+    Test the parse_hotel_location function with a page without location.
+    """
+    location = parse_hotel_location("<html></html>", "")
+    assert location["latitude"] is None
+    assert location["station"] is None
+
+
+def test_hotel_geo_index_nearest() -> None:
+    """
+    Test that the nearest hotels are returned in distance order.
+    """
+    hotels: list[dict[str, Any]] = [
+        {"id": "shinagawa", "latitude": 35.6284, "longitude": 139.7387},
+        {"id": "tamachi", "latitude": 35.6457, "longitude": 139.7476},
+        {"id": "gotanda", "latitude": 35.6262, "longitude": 139.7236},
+        {"id": "osaka", "latitude": 34.7025, "longitude": 135.4959},
+        {"id": "unknown", "latitude": None, "longitude": None},
+    ]
+    index = HotelGeoIndex(hotels)
+    assert index.size == 4
+
+    result = index.nearest(35.6284, 139.7387, 3)
+    assert [hotel["id"] for _, hotel in result] == ["shinagawa", "gotanda", "tamachi"]
+    assert result[0][0] == 0
+
+
+def test_hotel_geo_index_max_distance() -> None:
+    """
+    Test that hotels farther than the maximum distance are excluded.
+    """
+    hotels: list[dict[str, Any]] = [
+        {"id": "shinagawa", "latitude": 35.6284, "longitude": 139.7387},
+        {"id": "osaka", "latitude": 34.7025, "longitude": 135.4959},
+    ]
+    index = HotelGeoIndex(hotels)
+    result = index.nearest(35.6284, 139.7387, 2, max_distance_km=10)
+    assert [hotel["id"] for _, hotel in result] == ["shinagawa"]
+    assert haversine_distance_km(35.6284, 139.7387, 34.7025, 135.4959) > 10